@@ -1,38 +1,167 @@
 import argparse
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import imageio
 import numpy as np
 import pandas as pd
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageFont
 
+from cover_images import existing_covers, load_resized_cover
+from reading_history import load_reading_sessions
 
-def parse_read_dates(read_dates_str):
-    """Parse the read_dates string format, returning all finish dates"""
-    if pd.isna(read_dates_str):
-        return []
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-    finish_dates = []
-    cleaned_str = read_dates_str.strip('"')
-    sessions = [s.strip() for s in cleaned_str.split(";") if s.strip()]
 
-    for session in sessions:
-        try:
-            if session.startswith(","):
-                # Just an end date
-                end_date = pd.to_datetime(session[1:].strip())
-                finish_dates.append(end_date)
-            else:
-                # Has start and end date
-                dates = [d.strip() for d in session.split(",") if d.strip()]
-                if len(dates) == 2:
-                    end_date = pd.to_datetime(dates[1])
-                    finish_dates.append(end_date)
-        except Exception:
-            continue
+def _accumulate_read_numbers(codes, counts, read_numbers):
+    for i in range(len(codes)):
+        code = codes[i]
+        counts[code] += 1
+        read_numbers[i] = counts[code]
+
+
+if njit is not None:
+    _accumulate_read_numbers = njit(cache=True)(_accumulate_read_numbers)
+
+
+def compute_read_numbers(book_ids):
+    """
+    Number each reading session per book (1 for a first read) in a single
+    pass over finish-date-sorted sessions. book_ids are factorized to array
+    indices and the counting loop is numba-compiled when available
+    """
+    codes, uniques = pd.factorize(book_ids)
+    counts = np.zeros(len(uniques), dtype=np.int32)
+    read_numbers = np.empty(len(codes), dtype=np.int32)
+    _accumulate_read_numbers(codes, counts, read_numbers)
+    return read_numbers
+
+# Loaded once; creating the font per frame is wasted work
+FONT = ImageFont.load_default()
+
+_SCRATCH_DRAW = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+_DATE_STRIPS = {}
+
+
+def render_date_strip(date_text):
+    """
+    Render the date overlay once per unique string. Stroked text is one of
+    the most expensive PIL draw calls and dates repeat across sessions, so
+    the rendered strips are cached and pasted onto each frame
+    """
+    strip = _DATE_STRIPS.get(date_text)
+    if strip is None:
+        bbox = _SCRATCH_DRAW.textbbox((1, 1), date_text, font=FONT, stroke_width=1)
+        strip = Image.new("RGBA", (bbox[2] + 1, bbox[3] + 1), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(strip)
+        draw.text(
+            (1, 1),
+            date_text,
+            font=FONT,
+            fill="white",
+            stroke_width=1,
+            stroke_fill="black",
+        )
+        _DATE_STRIPS[date_text] = strip
+    return strip
+
+
+def build_frame(job):
+    """
+    Build one frame and return its raw RGB bytes. Takes a plain dict so it
+    pickles cleanly into worker processes; each worker keeps its own date
+    strip cache
+    """
+    target_size = job["target_size"]
+
+    if job["cover_path"] is not None:
+        # Load and resize cover, via the on-disk resize cache
+        frame = load_resized_cover(Path(job["cover_path"]), target_size)
+    else:
+        # Create placeholder for missing cover
+        frame = Image.new("RGB", target_size, "lightgray")
+        draw = ImageDraw.Draw(frame)
+        draw.text(
+            (150, 200),
+            f"{job['title']}\nby\n{job['author']}",
+            font=FONT,
+            fill="black",
+            anchor="mm",
+            align="center",
+        )
+
+    # Add date overlay from the strip cache
+    strip = render_date_strip(job["date_text"])
+    frame.paste(strip, (9, 434), strip)
+    return frame.tobytes()
+
 
-    return finish_dates
+def start_ffmpeg_encoder(output_file, is_mp4, target_size, fps):
+    """
+    Start an ffmpeg process that encodes raw RGB frames piped to its stdin.
+    Returns None when ffmpeg is not on PATH so callers can fall back to the
+    slower in-process encoders.
+    """
+    if shutil.which("ffmpeg") is None:
+        return None
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-s",
+        f"{target_size[0]}x{target_size[1]}",
+        "-r",
+        str(fps),
+        "-i",
+        "-",
+    ]
+    if is_mp4:
+        command += [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-threads",
+            "0",
+            "-pix_fmt",
+            "yuv420p",
+        ]
+    else:
+        # Two-pass palette in a single invocation for a high-quality GIF
+        command += ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"]
+    command.append(str(output_file))
+
+    return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+
+def start_imageio_writer(output_file, is_mp4, frame_duration, fps):
+    """
+    In-process fallback encoder used when ffmpeg is not on PATH. Frames are
+    still appended one at a time so memory stays constant
+    """
+    if is_mp4:
+        try:
+            return imageio.get_writer(
+                output_file, fps=fps, codec="libx264", quality=8, macro_block_size=None
+            )
+        except Exception as err:
+            # Fallback if libx264 not available
+            print(f"Warning: libx264 codec not available, trying alternative: {err}")
+            return imageio.get_writer(output_file, fps=fps)
+    # The Pillow GIF plugin behind imageio takes duration in milliseconds
+    return imageio.get_writer(output_file, duration=frame_duration, loop=0)
 
 
 def create_reading_animation(
@@ -42,6 +171,7 @@ def create_reading_animation(
     output_file=None,
     frame_duration=300,
     output_format=None,
+    use_cache=True,
 ):
     """
     Create an animated GIF or MP4 video of book covers in reading order, including rereads
@@ -59,137 +189,117 @@ def create_reading_animation(
         else:
             output_format = "gif"
 
-    # Read and process data
-    df = pd.read_csv(csv_file)
+    # Read and process data, one row per reading session
+    books_df = load_reading_sessions(csv_file, use_cache=use_cache)
     covers_path = Path(covers_dir)
-
-    # Get all finish dates and book info
-    records = []
-    for _, row in df.iterrows():
-        finish_dates = parse_read_dates(row["read_dates"])
-        for finish_date in finish_dates:  # Process each reading session
-            records.append(
-                {
-                    "finish_date": finish_date,
-                    "book_id": row["Book Id"],
-                    "title": row["Title"],
-                    "author": row["Author"],
-                    "read_count": len(finish_dates),  # Track total number of reads
-                }
-            )
-
-    books_df = pd.DataFrame(records)
-
-    # Filter for specified year and sort by finish date
-    books_df["finish_date"] = pd.to_datetime(books_df["finish_date"])
-    books_year = books_df[books_df["finish_date"].dt.year == year].sort_values(
-        "finish_date"
+    # Track total number of reads per book
+    books_df["read_count"] = books_df.groupby("book_id")["finish_date"].transform(
+        "count"
     )
+    # Sort by finish date once and number each book's reading sessions,
+    # so the frame loop never has to rescan the whole frame per book
+    books_df = books_df.sort_values("finish_date")
+    books_df["read_number"] = compute_read_numbers(books_df["book_id"])
+
+    # Filter for specified year (order is kept from the sort above)
+    books_year = books_df[books_df["finish_date"].dt.year == year]
 
     if len(books_year) == 0:
         print(f"No books found for {year}")
         return
 
-    # Initialize list for frames
-    frames = []
     target_size = (300, 450)  # Standard size for all covers
+    is_mp4 = output_format == "mp4" or Path(output_file).suffix.lower() == ".mp4"
+    # Calculate fps from frame_duration (milliseconds to fps)
+    fps = 1000.0 / frame_duration if frame_duration > 0 else 30
 
-    # Create frames for each book reading session
-    for _, book in books_year.iterrows():
-        cover_path = covers_path / f"{book.book_id}.jpg"
-
-        # Create frame
-        if cover_path.exists():
-            # Load and resize cover
-            with Image.open(cover_path) as img:
-                frame = img.convert("RGB")
-                frame = frame.resize(target_size, Image.Resampling.LANCZOS)
-        else:
-            # Create placeholder for missing cover
-            frame = Image.new("RGB", target_size, "lightgray")
-            draw = ImageDraw.Draw(frame)
-            draw.text(
-                (150, 200),
-                f"{book.title}\nby\n{book.author}",
-                fill="black",
-                anchor="mm",
-                align="center",
-            )
+    # Stream frames straight into ffmpeg when available: it multithreads the
+    # encode and holds one frame in flight instead of the whole animation
+    ffmpeg_proc = start_ffmpeg_encoder(output_file, is_mp4, target_size, fps)
+    writer = None
+    if ffmpeg_proc is None:
+        writer = start_imageio_writer(output_file, is_mp4, frame_duration, fps)
 
-        # Add date overlay
-        draw = ImageDraw.Draw(frame)
+    # List the covers directory once instead of stat()-ing per book
+    available_covers = existing_covers(covers_path)
+
+    # Describe each frame with plain picklable values for the worker pool
+    jobs = []
+    for _, book in books_year.iterrows():
+        cover_name = f"{book.book_id}.jpg"
         date_text = book.finish_date.strftime("%b %d, %Y")
-        if book.read_count > 1:
-            # Calculate which read this is by counting previous reads
-            read_number = pd.Series(
-                books_df[books_df["book_id"] == book.book_id]["finish_date"]
-                <= book.finish_date
-            ).sum()
-            if read_number > 1:
-                date_text += f" (Read #{read_number})"
-        draw.text(
-            (10, 435), date_text, fill="white", stroke_width=1, stroke_fill="black"
+        if book.read_number > 1:
+            date_text += f" (Read #{book.read_number})"
+        jobs.append(
+            {
+                "cover_path": str(covers_path / cover_name)
+                if cover_name in available_covers
+                else None,
+                "title": book.title,
+                "author": book.author,
+                "date_text": date_text,
+                "target_size": target_size,
+            }
         )
 
-        frames.append(frame)
-
-    # Save as animated GIF or MP4
-    if frames:
-        output_path = Path(output_file)
-        file_ext = output_path.suffix.lower()
-
-        if file_ext == ".mp4" or output_format == "mp4":
-            # Convert frames to numpy arrays for imageio
-            frame_arrays = [np.array(frame) for frame in frames]
-            # Calculate fps from frame_duration (milliseconds to fps)
-            fps = 1000.0 / frame_duration if frame_duration > 0 else 30
-            # Save as MP4
-            try:
-                imageio.mimwrite(
-                    output_file, frame_arrays, fps=fps, codec="libx264", quality=8
-                )
-            except Exception as err:
-                # Fallback if libx264 not available
-                print(
-                    f"Warning: libx264 codec not available, trying alternative: {err}"
+    # Frame construction (decode + resize + overlay) is CPU-bound and
+    # independent per book, so it runs across cores; map preserves order,
+    # keeping the timeline correct while the encoder consumes serially
+    frame_count = len(jobs)
+    with ProcessPoolExecutor() as executor:
+        for rgb_bytes in executor.map(build_frame, jobs, chunksize=4):
+            if ffmpeg_proc is not None:
+                try:
+                    ffmpeg_proc.stdin.write(rgb_bytes)
+                except BrokenPipeError:
+                    # ffmpeg died mid-encode; stop feeding it and let the
+                    # exit-status check below report the failure
+                    break
+            else:
+                writer.append_data(
+                    np.frombuffer(rgb_bytes, dtype=np.uint8).reshape(
+                        target_size[1], target_size[0], 3
+                    )
                 )
-                imageio.mimwrite(output_file, frame_arrays, fps=fps)
-            print(
-                f"Created MP4 video with {len(frames)} reading sessions in {output_file}"
-            )
-        else:
-            # Save as animated GIF
-            frames[0].save(
-                output_file,
-                save_all=True,
-                append_images=frames[1:],
-                duration=frame_duration,
-                loop=0,
-            )
-            print(
-                f"Created GIF animation with {len(frames)} reading sessions in {output_file}"
-            )
 
-        # Print some statistics
-        unique_books = len(books_year["book_id"].unique())
-        total_reads = len(books_year)
-        reread_books = books_year[books_year["read_count"] > 1]["book_id"].nunique()
-        print(f"\nReading Statistics for {year}:")
-        print(f"Unique books: {unique_books}")
-        print(f"Total reading sessions: {total_reads}")
-        print(f"Books that were reread: {reread_books}")
-
-        if reread_books > 0:
-            print("\nBooks with multiple reads:")
-            reread_stats = (
-                books_year[books_year["read_count"] > 1]
-                .drop_duplicates("book_id")[["title", "read_count"]]
-                .sort_values("read_count", ascending=False)
-            )
-            for _, book in reread_stats.iterrows():
-                print(f"- {book['title']}: {book['read_count']} times")
+    # Finish encoding
+    if ffmpeg_proc is not None:
+        try:
+            ffmpeg_proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        if ffmpeg_proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed while encoding {output_file}")
     else:
-        print("No frames created")
+        writer.close()
+
+    if is_mp4:
+        print(
+            f"Created MP4 video with {frame_count} reading sessions in {output_file}"
+        )
+    else:
+        print(
+            f"Created GIF animation with {frame_count} reading sessions in {output_file}"
+        )
+
+    # Print some statistics
+    unique_books = len(books_year["book_id"].unique())
+    total_reads = len(books_year)
+    reread_books = books_year[books_year["read_count"] > 1]["book_id"].nunique()
+    print(f"\nReading Statistics for {year}:")
+    print(f"Unique books: {unique_books}")
+    print(f"Total reading sessions: {total_reads}")
+    print(f"Books that were reread: {reread_books}")
+
+    if reread_books > 0:
+        print("\nBooks with multiple reads:")
+        reread_stats = (
+            books_year[books_year["read_count"] > 1]
+            .drop_duplicates("book_id")[["title", "read_count"]]
+            .sort_values("read_count", ascending=False)
+        )
+        for _, book in reread_stats.iterrows():
+            print(f"- {book['title']}: {book['read_count']} times")
 
 
 if __name__ == "__main__":
@@ -238,6 +348,11 @@ if __name__ == "__main__":
         default=300,
         help="Frame duration in milliseconds (default: 300)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the parsed reading history cache and re-read the CSV",
+    )
 
     args = parser.parse_args()
     create_reading_animation(
@@ -247,4 +362,5 @@ if __name__ == "__main__":
         args.output,
         args.frame_duration,
         args.format,
+        use_cache=not args.no_cache,
     )
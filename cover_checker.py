@@ -2,65 +2,29 @@ import argparse
 from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
+from cover_images import existing_covers
+from reading_history import load_reading_sessions
 
 
-def parse_read_dates(read_dates_str):
-    """Parse the read_dates string format"""
-    if pd.isna(read_dates_str):
-        return []
-
-    finish_dates = []
-    cleaned_str = read_dates_str.strip('"')
-    sessions = [s.strip() for s in cleaned_str.split(";") if s.strip()]
-
-    for session in sessions:
-        try:
-            if session.startswith(","):
-                end_date = pd.to_datetime(session[1:].strip())
-                finish_dates.append(end_date)
-            else:
-                dates = [d.strip() for d in session.split(",") if d.strip()]
-                if len(dates) == 2:
-                    end_date = pd.to_datetime(dates[1])
-                    finish_dates.append(end_date)
-        except Exception:
-            continue
-
-    return finish_dates
-
-
-def check_missing_covers(csv_file, year, covers_dir="./book_covers"):
-    # Read CSV file
-    df = pd.read_csv(csv_file)
+def check_missing_covers(csv_file, year, covers_dir="./book_covers", use_cache=True):
     covers_path = Path(covers_dir)
 
-    # Process finish dates
-    records = []
-    for _, row in df.iterrows():
-        finish_dates = parse_read_dates(row["read_dates"])
-        if finish_dates:  # Only include books with finish dates
-            latest_finish = max(finish_dates)
-            records.append(
-                {
-                    "finish_date": latest_finish,
-                    "book_id": row["Book Id"],
-                    "title": row["Title"],
-                    "author": row["Author"],
-                }
-            )
-
-    books_df = pd.DataFrame(records)
+    # Keep one row per book with its most recent finish date
+    books_df = (
+        load_reading_sessions(csv_file, use_cache=use_cache)
+        .sort_values("finish_date")
+        .drop_duplicates("book_id", keep="last")
+    )
 
     # Filter for specified year
-    books_df["finish_date"] = pd.to_datetime(books_df["finish_date"])
     books_year = books_df[books_df["finish_date"].dt.year == year].copy()
 
-    # Check for missing covers
+    # Check for missing covers against one listing of the directory
+    available_covers = existing_covers(covers_path)
     missing_covers = []
     for _, book in books_year.iterrows():
         cover_path = covers_path / f"{book.book_id}.jpg"
-        if not cover_path.exists():
+        if cover_path.name not in available_covers:
             missing_covers.append(
                 {
                     "book_id": book.book_id,
@@ -111,6 +75,11 @@ if __name__ == "__main__":
         default="./book_covers",
         help="Directory containing book covers (default: ./book_covers)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the parsed reading history cache and re-read the CSV",
+    )
 
     args = parser.parse_args()
-    check_missing_covers(args.csv, args.year, args.covers_dir)
+    check_missing_covers(args.csv, args.year, args.covers_dir, not args.no_cache)
@@ -0,0 +1,83 @@
+"""Shared helpers for loading and resizing book cover images"""
+
+from PIL import Image
+
+try:
+    # SIMD-accelerated resizing (AVX2/SSE4.1/NEON); one Resizer instance is
+    # shared across all covers with the Lanczos choice carried in the
+    # options. The distribution renamed its module to cykooz_resizer in
+    # 4.x; any failure here (older API included) disables the fast path
+    try:
+        from cykooz_resizer import FilterType, ResizeAlg, ResizeOptions, Resizer
+    except ImportError:
+        from cykooz.resizer import FilterType, ResizeAlg, ResizeOptions, Resizer
+
+    _RESIZER = Resizer()
+    _RESIZE_OPTIONS = ResizeOptions(
+        resize_alg=ResizeAlg.convolution(FilterType.lanczos3)
+    )
+except Exception:
+    _RESIZER = None
+
+try:
+    # libjpeg-turbo decodes with SIMD and is several times faster than the
+    # scalar libjpeg path Pillow uses. TurboJPEG() raises when the shared
+    # library itself is missing, not just on import
+    from turbojpeg import TJPF_RGB, TurboJPEG
+
+    _TURBOJPEG = TurboJPEG()
+except Exception:
+    _TURBOJPEG = None
+
+
+def existing_covers(covers_path):
+    """
+    List the cover files in a directory once, so callers test membership in
+    a set instead of paying one stat() syscall per book
+    """
+    if not covers_path.is_dir():
+        return set()
+    return {p.name for p in covers_path.iterdir() if p.suffix == ".jpg"}
+
+
+def open_cover(cover_path):
+    """Decode a cover JPEG to an RGB PIL image, via turbojpeg when available"""
+    if _TURBOJPEG is not None:
+        with open(cover_path, "rb") as f:
+            return Image.fromarray(_TURBOJPEG.decode(f.read(), pixel_format=TJPF_RGB))
+    with Image.open(cover_path) as img:
+        return img.convert("RGB")
+
+
+def resize_cover(img, target_size):
+    """Resize a cover image, using the SIMD backend when available"""
+    if _RESIZER is None:
+        return img.resize(target_size, Image.Resampling.LANCZOS)
+    resized = Image.new(img.mode, target_size)
+    _RESIZER.resize_pil(img, resized, _RESIZE_OPTIONS)
+    return resized
+
+
+def load_resized_cover(cover_path, target_size):
+    """
+    Load a cover resized to target_size through an on-disk cache kept in a
+    .cache_{W}x{H} directory next to the covers. Later runs at the same
+    size skip both the full-size decode and the resize; a source cover
+    newer than its cached copy invalidates the entry
+    """
+    cache_dir = cover_path.parent / f".cache_{target_size[0]}x{target_size[1]}"
+    cached = cache_dir / cover_path.name
+    try:
+        if cached.stat().st_mtime >= cover_path.stat().st_mtime:
+            return open_cover(cached)
+    except OSError:
+        pass
+
+    img = resize_cover(open_cover(cover_path), target_size)
+    try:
+        cache_dir.mkdir(exist_ok=True)
+        img.save(cached, quality=90)
+    except OSError:
+        # The cache is best-effort; a failed write never breaks the run
+        pass
+    return img
@@ -1,49 +1,85 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound
 import requests
 import re
 from pathlib import Path
+import shutil
+import threading
 import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
-def download_covers(html_path: str, output_dir: str = "book_covers"):
+# Browser-like headers shared by every download
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://www.goodreads.com/'
+}
+
+# Compiled once instead of per review
+BOOK_ID_RE = re.compile(r'/book/show/(\d+)')
+COVER_IMG_ID_RE = re.compile(r'^cover_review_')
+SIZE_RE = re.compile(r'_SX\d+_')
+TRAILING_SIZE_RE = re.compile(r'\._\.jpg$')
+
+class RateLimiter:
+    """Spaces requests out across download threads so we stay nice to Goodreads"""
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def download_covers(html_path: str, output_dir: str = "book_covers",
+                    max_workers: int = 8, request_interval: float = 0.2):
     # Create output directory if it doesn't exist
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
-    
+
     # Read the HTML file
     with open(html_path, 'r', encoding='utf-8') as f:
         html_content = f.read()
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Find all book review divs
+
+    try:
+        # lxml's C parser is several times faster than the stdlib one
+        soup = BeautifulSoup(html_content, 'lxml')
+    except FeatureNotFound:
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+    # First pass: collect (book_id, url, output_file) for everything that
+    # actually needs downloading; local files are copied right away
+    downloads = []
     for review in soup.find_all('div', class_='bookalike review'):
         try:
             # Find the book URL and extract ID
-            book_link = review.find('a', href=re.compile(r'/book/show/\d+'))
+            book_link = review.find('a', href=BOOK_ID_RE)
             if not book_link:
                 continue
-                
+
             # Extract the book ID from the URL
-            book_id = re.search(r'/book/show/(\d+)', book_link['href']).group(1)
-                
+            book_id = BOOK_ID_RE.search(book_link['href']).group(1)
+
             # Find cover image
-            cover_img = review.find('img', id=lambda x: x and x.startswith('cover_review_'))
+            cover_img = review.find('img', id=COVER_IMG_ID_RE)
             if not cover_img or 'src' not in cover_img.attrs:
                 continue
-                
+
             url = cover_img['src']
-            
+
             # Handle relative URLs (when HTML is saved with local files)
             if url.startswith('./') or not url.startswith('http'):
                 # Try to find the actual image file in the saved files directory
                 html_dir = Path(html_path).parent
                 saved_files_dir = html_dir / f"{Path(html_path).stem}_files"
                 local_file = saved_files_dir / url.replace('./', '').replace(f"{Path(html_path).stem}_files/", '')
-                
+
                 if local_file.exists():
                     # Copy the local file instead of downloading
-                    import shutil
                     output_file = output_path / f"{book_id}.jpg"
                     if not output_file.exists():
                         print(f"Copying {book_id}.jpg from saved files")
@@ -57,38 +93,48 @@ def download_covers(html_path: str, output_dir: str = "book_covers"):
                     continue
             else:
                 # Convert to high resolution by removing size constraint
-                url = re.sub(r'_SX\d+_', '_', url)
+                url = SIZE_RE.sub('_', url)
                 # Also try removing other size constraints
-                url = re.sub(r'\._\.jpg$', '.jpg', url)
-            
+                url = TRAILING_SIZE_RE.sub('.jpg', url)
+
             # Define output path for this book
             output_file = output_path / f"{book_id}.jpg"
-            
+
             # Skip if file already exists
             if output_file.exists():
                 print(f"Skipping {book_id}.jpg - already exists")
                 continue
-            
-            # Download the image with browser-like headers
+
+            downloads.append((book_id, url, output_file))
+
+        except Exception as e:
+            print(f"Error processing book {book_id if 'book_id' in locals() else 'unknown'}: {str(e)}")
+            continue
+
+    # Second pass: download in parallel over one keep-alive session; each
+    # request is dominated by round-trip latency, not CPU
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    limiter = RateLimiter(request_interval)
+
+    def fetch_one(job):
+        book_id, url, output_file = job
+        try:
+            limiter.wait()
             print(f"Downloading {book_id}.jpg from {url}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Referer': 'https://www.goodreads.com/'
-            }
-            response = requests.get(url, headers=headers)
+            response = session.get(url, timeout=10)
             response.raise_for_status()
-            
+
             # Save the image
             with open(output_file, 'wb') as f:
                 f.write(response.content)
-            
-            # Be nice to Goodreads servers
-            time.sleep(1)
-            
         except Exception as e:
-            print(f"Error processing book {book_id if 'book_id' in locals() else 'unknown'}: {str(e)}")
-            continue
-            
+            print(f"Error downloading {book_id}.jpg: {str(e)}")
+
+    if downloads:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(fetch_one, downloads))
+
     print("Download complete!")
 
 if __name__ == "__main__":
@@ -99,6 +145,9 @@ if __name__ == "__main__":
     parser.add_argument('-o', '--output-dir', type=str,
                        default='book_covers',
                        help='Directory to save cover images (default: book_covers)')
-    
+    parser.add_argument('-w', '--workers', type=int,
+                       default=8,
+                       help='Number of parallel download threads (default: 8)')
+
     args = parser.parse_args()
-    download_covers(args.html, args.output_dir)
\ No newline at end of file
+    download_covers(args.html, args.output_dir, args.workers)
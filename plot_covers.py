@@ -1,81 +1,105 @@
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
 from pathlib import Path
 import matplotlib.gridspec as gridspec
 import argparse
 from datetime import datetime
+from PIL import Image, ImageDraw, ImageFont
 
-def parse_read_dates(read_dates_str):
-    """Parse the read_dates string format"""
-    if pd.isna(read_dates_str):
-        return []
-    
-    finish_dates = []
-    cleaned_str = read_dates_str.strip('"')
-    sessions = [s.strip() for s in cleaned_str.split(';') if s.strip()]
-    
-    for session in sessions:
-        try:
-            if session.startswith(','):
-                end_date = pd.to_datetime(session[1:].strip())
-                finish_dates.append(end_date)
-            else:
-                dates = [d.strip() for d in session.split(',') if d.strip()]
-                if len(dates) == 2:
-                    end_date = pd.to_datetime(dates[1])
-                    finish_dates.append(end_date)
-        except Exception as e:
-            continue
-            
-    return finish_dates
-
-def create_monthly_book_grid(csv_file, year, covers_dir='./book_covers', title=None):
+from cover_images import existing_covers, load_resized_cover
+from reading_history import load_reading_sessions
+
+# Pixel size of each cover tile in the composed grid
+COVER_W, COVER_H = 200, 300
+
+# Layout of the pure-PIL PNG composite
+LABEL_W = 160   # Left margin holding the month labels
+TITLE_H = 60    # Banner above the grid for the title
+
+def load_cover_tile(covers_path, available_covers, book_id):
+    """Load one cover as a fixed-size PIL tile, gray when the cover is missing"""
+    cover_name = f'{book_id}.jpg'
+    if cover_name in available_covers:
+        return load_resized_cover(covers_path / cover_name, (COVER_W, COVER_H))
+    return Image.new('RGB', (COVER_W, COVER_H), 'lightgray')
+
+def month_row_counts(books_year):
+    """Rows each month needs at up to 8 covers per row, as a per-month Series"""
+    month_sizes = books_year.groupby('month').size()
+    return (month_sizes - 1) // month_sizes.clip(upper=8) + 1
+
+def save_monthly_grid_png(books_year, covers_path, available_covers, title,
+                          png_output):
+    """
+    Compose the whole grid with PIL and save it to disk. For headless batch
+    use this skips matplotlib's per-Axes and renderer overhead entirely
+    """
+    font = ImageFont.load_default()
+    month_rows = month_row_counts(books_year)
+
+    composite = Image.new('RGB',
+                          (LABEL_W + 8 * COVER_W,
+                           TITLE_H + int(month_rows.sum()) * COVER_H),
+                          'white')
+    draw = ImageDraw.Draw(composite)
+    draw.text((LABEL_W, TITLE_H // 2), title, font=font, fill='black', anchor='lm')
+
+    y = TITLE_H
+    for month, month_books in books_year.groupby('month', sort=True):
+        cols = min(8, len(month_books))
+
+        month_name = month_books.iloc[0].finish_date.strftime('%B')
+        draw.text((LABEL_W - 10, y + COVER_H // 2), month_name,
+                  font=font, fill='black', anchor='rm')
+
+        for book_idx, book in enumerate(month_books.itertuples()):
+            tile = load_cover_tile(covers_path, available_covers, book.book_id)
+            composite.paste(tile, (LABEL_W + (book_idx % cols) * COVER_W,
+                                   y + (book_idx // cols) * COVER_H))
+        y += int(month_rows[month]) * COVER_H
+
+    composite.save(png_output, optimize=True)
+    print(f"Saved book grid to {png_output}")
+
+def create_monthly_book_grid(csv_file, year, covers_dir='./book_covers', title=None,
+                             use_cache=True, png_output=None):
     if title is None:
         title = f'{year} Reading'
     
-    # Read and process data
-    df = pd.read_csv(csv_file)
+    # Read and process data, one row per reading session
+    books_df = load_reading_sessions(csv_file, use_cache=use_cache)
     covers_path = Path(covers_dir)
+    # List the covers directory once instead of stat()-ing per book
+    available_covers = existing_covers(covers_path)
 
-    # Get all finish dates and book info
-    records = []
-    for _, row in df.iterrows():
-        for date in parse_read_dates(row['read_dates']):
-            records.append({
-                'finish_date': date,
-                'book_id': row['Book Id'],
-                'title': row['Title']
-            })
-    
-    books_df = pd.DataFrame(records)
-    
     # Filter for specified year and group by month
-    books_df['finish_date'] = pd.to_datetime(books_df['finish_date'])
     books_year = books_df[books_df['finish_date'].dt.year == year].copy()
     books_year['month'] = books_year['finish_date'].dt.month
-    monthly_books = dict(tuple(books_year.groupby('month')))
 
-    # Calculate layout
-    active_months = sorted(monthly_books.keys())
-    if not active_months:
+    if books_year.empty:
         print(f"No books found for {year}")
         return
 
+    # Headless path: compose and save with PIL, skipping matplotlib
+    if png_output:
+        save_monthly_grid_png(books_year, covers_path, available_covers,
+                              title, png_output)
+        return
+
+    # Calculate layout in one vectorized pass over the month sizes
+    n_months = books_year['month'].nunique()
+    max_rows_per_month = int(month_row_counts(books_year).max())
+
     # Create figure with tighter spacing
     # Calculate height based on number of rows needed (more compact)
-    max_rows_per_month = max([(len(monthly_books[m]) - 1) // min(8, len(monthly_books[m])) + 1 
-                              for m in active_months] + [1])
-    fig_height = max(8, 1.2 * len(active_months) * max_rows_per_month)
+    fig_height = max(8, 1.2 * n_months * max_rows_per_month)
     fig = plt.figure(figsize=(15, fig_height))
-    
+
     # Create main gridspec with minimal spacing
-    outer_gs = gridspec.GridSpec(len(active_months), 1)
+    outer_gs = gridspec.GridSpec(n_months, 1)
     outer_gs.update(left=0.05, right=0.98, top=0.97, bottom=0.02, hspace=0.05)
 
-    for idx, month in enumerate(active_months):
-        month_books = monthly_books[month]
-        
+    for idx, (month, month_books) in enumerate(books_year.groupby('month', sort=True)):
         # Calculate grid dimensions for this month
         n_books = len(month_books)
         cols = min(8, n_books)  # Max 8 books per row
@@ -93,28 +117,24 @@ def create_monthly_book_grid(csv_file, year, covers_dir='./book_covers', title=N
         label_ax.set_yticks([])
         label_ax.axis('off')
         
-        # Books grid subplot with minimal spacing
-        books_gs = gridspec.GridSpecFromSubplotSpec(rows, cols, subplot_spec=month_gs[1],
-                                                   hspace=0.02, wspace=0.02)
-
-        # Plot book covers
+        # Compose all covers for the month into one array so matplotlib
+        # renders a single image instead of one Axes per book
+        canvas = np.full((rows * COVER_H, cols * COVER_W, 3), 255, dtype=np.uint8)
         for book_idx, book in enumerate(month_books.itertuples()):
             row = book_idx // cols
             col = book_idx % cols
-            
-            book_ax = plt.subplot(books_gs[row, col])
-            cover_path = covers_path / f"{book.book_id}.jpg"
-            
-            if cover_path.exists():
-                img = mpimg.imread(cover_path)
-                book_ax.imshow(img, aspect='equal')
-            else:
-                book_ax.add_patch(plt.Rectangle((0, 0), 1, 1, facecolor='lightgray'))
-            
-            book_ax.set_xticks([])
-            book_ax.set_yticks([])
-            book_ax.set_frame_on(False)
-            book_ax.set_aspect('equal')
+
+            tile = np.asarray(load_cover_tile(covers_path, available_covers,
+                                              book.book_id))
+            canvas[row * COVER_H:(row + 1) * COVER_H,
+                   col * COVER_W:(col + 1) * COVER_W] = tile
+
+        # Single books Axes per month
+        books_ax = plt.subplot(month_gs[1])
+        books_ax.imshow(canvas, aspect='equal')
+        books_ax.set_xticks([])
+        books_ax.set_yticks([])
+        books_ax.axis('off')
 
     plt.suptitle(title, y=0.99, fontsize=14, fontweight='bold')
     plt.show()
@@ -133,6 +153,11 @@ if __name__ == "__main__":
     parser.add_argument('-t', '--title', type=str,
                        default=None,
                        help='Title for the plot (default: {year} Reading)')
-    
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore the parsed reading history cache and re-read the CSV')
+    parser.add_argument('--png', type=str, default=None, metavar='OUTPUT.png',
+                       help='Save the grid straight to a PNG with PIL instead of showing it with matplotlib')
+
     args = parser.parse_args()
-    create_monthly_book_grid(args.csv, args.year, args.covers_dir, args.title)
\ No newline at end of file
+    create_monthly_book_grid(args.csv, args.year, args.covers_dir, args.title,
+                             use_cache=not args.no_cache, png_output=args.png)
\ No newline at end of file
@@ -7,48 +7,12 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 
+from reading_history import load_reading_sessions
 
-def parse_read_dates(read_dates_str):
-    """
-    Parse the read_dates string format
-    - The entire string is wrapped in quotes
-    - Leading comma indicates no start date, just end date (e.g. ",2024-05-01")
-    - Dates without leading comma have both start and end (e.g. "2024-10-21,2024-10-21")
-    - Multiple sessions separated by semicolons
-    Returns a list of end dates (when books were finished)
-    """
-    if pd.isna(read_dates_str):
-        return []
-
-    finish_dates = []
-    # Remove the outer quotes and split by semicolon
-    cleaned_str = read_dates_str.strip('"')
-    sessions = [s.strip() for s in cleaned_str.split(";") if s.strip()]
-
-    for session in sessions:
-        try:
-            if session.startswith(","):
-                # Just an end date
-                end_date = pd.to_datetime(session[1:].strip())
-                finish_dates.append(end_date)
-            else:
-                # Has both start and end date
-                dates = [d.strip() for d in session.split(",") if d.strip()]
-                if len(dates) == 2:  # Should have both start and end date
-                    end_date = pd.to_datetime(dates[1])
-                    finish_dates.append(end_date)
-                else:
-                    print(
-                        f"Warning: Expected start and end date for session without leading comma: {session}"
-                    )
-        except Exception:
-            print(f"Warning: Could not parse date session: {session}")
-            continue
-
-    return finish_dates
-
-
-def create_reading_heatmap(csv_file, year, name="Isabel", orientation="landscape"):
+
+def create_reading_heatmap(
+    csv_file, year, name="Isabel", orientation="landscape", use_cache=True
+):
     """
     Generate a GitHub-style heatmap of reading activity.
 
@@ -57,54 +21,29 @@ def create_reading_heatmap(csv_file, year, name="Isabel", orientation="landscape
     year (int): Year to create heatmap for
     name (str): Name to use in title
     orientation (str): 'landscape' or 'portrait' orientation for the plot
+    use_cache (bool): Use the parsed reading history cache when fresh
     """
-    # Read the CSV file
-    df = pd.read_csv(csv_file)
-
-    # Get all finish dates from read_dates column
-    all_finish_dates = []
-    for dates in df["read_dates"]:
-        all_finish_dates.extend(parse_read_dates(dates))
-
-    # Convert to DataFrame for easier handling
-    dates_df = pd.DataFrame({"finish_date": all_finish_dates})
+    # Read the CSV file, one row per finished reading session
+    dates_df = load_reading_sessions(csv_file, use_cache=use_cache)
 
     # Create a date range for all days in the specified year
     start_date = pd.Timestamp(f"{year}-01-01")
     end_date = pd.Timestamp(f"{year}-12-31")
     all_dates = pd.date_range(start=start_date, end=end_date)
 
-    # Filter for books finished in the specified year and count books per day
-    dates_df["finish_date"] = pd.to_datetime(dates_df["finish_date"])
-    dates_year = dates_df[dates_df["finish_date"].dt.year == year]
+    # Count books per day; the reindex keeps only the specified year
     daily_counts = (
         dates_df["finish_date"].value_counts().reindex(all_dates, fill_value=0)
     )
 
-    # Create week numbers and day numbers for the heatmap
-    weeks = []
-    days = []
-    months = []
-    counts = []
-
-    for date in all_dates:
-        # Week number (0-52)
-        week = date.strftime("%U")
-        # Day of week (0-6), where 0 is Monday
-        day = date.weekday()
-        # Month
-        month = date.month - 1  # 0-based index
-        count = daily_counts[date]
-
-        weeks.append(int(week))
-        days.append(day)
-        months.append(month)
-        counts.append(count)
-
-    # Create the heatmap data
+    # Week numbers (0-52) and days of week (0-6, where 0 is Monday) for
+    # every day of the year, computed in one vectorized pass
+    weeks = all_dates.strftime("%U").astype(int).values
+    days = all_dates.weekday.values
+
+    # Scatter the daily counts into the grid
     heatmap_data = np.zeros((7, 53))  # 7 days x 53 weeks
-    for w, d, c in zip(weeks, days, counts):
-        heatmap_data[d, w] = c
+    np.add.at(heatmap_data, (days, weeks), daily_counts.values)
 
     # Set up the figure size based on orientation
     if orientation.lower() == "landscape":
@@ -234,6 +173,13 @@ if __name__ == "__main__":
         default="landscape",
         help="Orientation: landscape or portrait (default: landscape)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the parsed reading history cache and re-read the CSV",
+    )
 
     args = parser.parse_args()
-    create_reading_heatmap(args.csv, args.year, args.name, args.orientation)
+    create_reading_heatmap(
+        args.csv, args.year, args.name, args.orientation, not args.no_cache
+    )